@@ -1,22 +1,37 @@
 import pandas as pd
-import random
-import time
+import numpy as np
+import asyncio
+import csv
 import requests
 import os
 import sys
+import threading
 from datetime import datetime
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 # Load API Key from your .env
 load_dotenv(dotenv_path='../.env')
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # --- CONFIG ---
 DATA_DIR = '../server/data'
 REFRESH_URL = 'http://localhost:3001/api/sentiment/refresh'
+RNG = np.random.default_rng()
+HTTP = requests.Session()
 
-def generate_ai_comments(scenario="normal", count=1):
+# Per-scenario (min, max) engagement bumps, in ORGANIC_COLUMNS order
+ORGANIC_COLUMNS = ['impressions', 'reach', 'likes', 'shares']
+ORGANIC_BUMPS = {
+    # Massive spike for Viral Growth
+    "viral": [(5000, 15000), (2000, 8000), (800, 2500), (100, 400)],
+    # High impressions (bad news travels fast), but low likes
+    "crisis": [(1000, 3000), (500, 1500), (0, 5), (0, 0)],
+    # Normal slow growth
+    "normal": [(20, 100), (10, 50), (5, 20), (0, 0)]
+}
+
+async def generate_ai_comments(scenario="normal", count=1):
     """Uses GPT to generate highly realistic social media comments."""
     prompts = {
         "normal": "Generate a mix of short positive and neutral social media comments for a sustainable clothing brand. Use some Hinglish.",
@@ -25,7 +40,7 @@ def generate_ai_comments(scenario="normal", count=1):
     }
     
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": f"{prompts.get(scenario, 'normal')} Return {count} comments as a simple list, one per line. Max 15 words per comment. Use emojis."}]
         )
@@ -43,50 +58,35 @@ def update_csv(file_name, logic_func):
         return True
     return False
 
-def run_simulation_cycle(scenario="normal"):
-    print(f"🎬 [SCENARIO: {scenario.upper()}] - Updating all 8 CSVs...")
+def append_csv(file_name, rows):
+    """Appends new rows without re-reading or rewriting the existing file."""
+    path = os.path.join(DATA_DIR, file_name)
+    if os.path.exists(path):
+        with open(path, newline='', encoding='utf-8') as f:
+            fieldnames = next(csv.reader(f))
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=fieldnames, lineterminator='\n').writerows(rows)
+        return True
+    return False
 
-    # 1. UPDATE COMMENTS (Higher count for viral/crisis)
-    comment_count = 10 if scenario == "viral" else (5 if scenario == "crisis" else 1)
-    new_comment_texts = generate_ai_comments(scenario, count=comment_count)
-    
-    def comment_logic(df):
-        new_rows = []
-        for text in new_comment_texts:
-            new_rows.append({
-                "comment_id": f"C_{random.randint(5000, 9999)}",
-                "post_id": f"POST_000{random.randint(1,4)}",
-                "user_handle": f"user_{random.randint(100,999)}",
-                "comment_text": text.strip(),
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-        return pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
-    
-    update_csv('synthetic_comments_data.csv', comment_logic)
+def trigger_refresh():
+    """Posts the dashboard refresh webhook, reusing the pooled HTTP session."""
+    try: HTTP.post(REFRESH_URL, timeout=5)
+    except requests.RequestException: pass
 
+def update_engagement(scenario="normal"):
+    """Bumps organic and ads metrics for one random row in each file."""
     # 2. UPDATE ORGANIC ENGAGEMENT (Growth/Crisis/Viral Logic)
     organic_files = ['facebook_organic_posts.csv', 'instagram_organic_posts.csv', 'linkedin_organic_posts.csv', 'twitter_organic_posts.csv']
     
     def organic_logic(df):
-        idx = random.randint(0, len(df)-1)
-        
-        if scenario == "viral":
-            # Massive spike for Viral Growth
-            df.loc[idx, 'impressions'] += random.randint(5000, 15000)
-            df.loc[idx, 'reach'] += random.randint(2000, 8000)
-            df.loc[idx, 'likes'] += random.randint(800, 2500)
-            df.loc[idx, 'shares'] += random.randint(100, 400)
-        elif scenario == "crisis":
-            # High impressions (bad news travels fast), but low likes
-            df.loc[idx, 'impressions'] += random.randint(1000, 3000)
-            df.loc[idx, 'reach'] += random.randint(500, 1500)
-            df.loc[idx, 'likes'] += random.randint(0, 5)
-        else:
-            # Normal slow growth
-            df.loc[idx, 'impressions'] += random.randint(20, 100)
-            df.loc[idx, 'reach'] += random.randint(10, 50)
-            df.loc[idx, 'likes'] += random.randint(5, 20)
-            
+        idx = RNG.integers(len(df))
+        cols = [df.columns.get_loc(c) for c in ORGANIC_COLUMNS]
+        # Draw all four bumps in one call from the (min, max) bounds
+        lows, highs = np.array(ORGANIC_BUMPS.get(scenario, ORGANIC_BUMPS["normal"])).T
+        bumps = RNG.integers(lows, highs, endpoint=True)
+        # Single positional write for all engagement columns of the chosen row
+        df.iloc[idx, cols] += bumps
         return df
 
     for f in organic_files: update_csv(f, organic_logic)
@@ -95,31 +95,59 @@ def run_simulation_cycle(scenario="normal"):
     ads_files = ['facebook_ads_ad_campaigns.csv', 'google_ads_ad_campaigns.csv', 'instagram_ads_ad_campaigns.csv']
     
     def ads_logic(df):
-        idx = random.randint(0, len(df)-1)
+        idx = RNG.integers(len(df))
         # Viral events usually drive organic traffic, but we simulate increased click interest
-        click_bump = random.randint(200, 600) if scenario == "viral" else random.randint(5, 15)
-        df.loc[idx, 'clicks'] += click_bump
-        df.loc[idx, 'total_spend'] += round(random.uniform(2.0, 15.0), 2)
+        click_bump = RNG.integers(200, 600, endpoint=True) if scenario == "viral" else RNG.integers(5, 15, endpoint=True)
+        # clicks (int) and total_spend (float) differ in dtype, so write each cell via iat
+        df.iat[idx, df.columns.get_loc('clicks')] += click_bump
+        df.iat[idx, df.columns.get_loc('total_spend')] += round(RNG.uniform(2.0, 15.0), 2)
         return df
 
     for f in ads_files: update_csv(f, ads_logic)
 
-    print(f"✅ Simulation Complete for {scenario}. Triggering Dashboard Refresh...")
-    try: requests.post(REFRESH_URL, timeout=5)
-    except: pass
+async def run_simulation_cycle(scenario="normal"):
+    print(f"🎬 [SCENARIO: {scenario.upper()}] - Updating all 8 CSVs...")
 
-if __name__ == "__main__":
-    args = [a.replace('--', '') for a in sys.argv]
+    # 1. UPDATE COMMENTS (Higher count for viral/crisis)
+    comment_count = 10 if scenario == "viral" else (5 if scenario == "crisis" else 1)
+
+    # Start the OpenAI request, then update the engagement CSVs (steps 2 & 3)
+    # in a worker thread while it is in flight
+    comments_task = asyncio.create_task(generate_ai_comments(scenario, count=comment_count))
+    await asyncio.to_thread(update_engagement, scenario)
+    new_comment_texts = await comments_task
     
+    new_rows = []
+    for text in new_comment_texts:
+        new_rows.append({
+            "comment_id": f"C_{RNG.integers(5000, 9999, endpoint=True)}",
+            "post_id": f"POST_000{RNG.integers(1, 4, endpoint=True)}",
+            "user_handle": f"user_{RNG.integers(100, 999, endpoint=True)}",
+            "comment_text": text.strip(),
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    append_csv('synthetic_comments_data.csv', new_rows)
+
+    print(f"✅ Simulation Complete for {scenario}. Triggering Dashboard Refresh...")
+    # Not a daemon thread: one-shot runs (--once/--crisis/--viral) still deliver it before exiting
+    threading.Thread(target=trigger_refresh).start()
+
+async def main(args):
     if "once" in args or "normal" in args:
-        run_simulation_cycle("normal")
+        await run_simulation_cycle("normal")
     elif "crisis" in args:
-        run_simulation_cycle("crisis")
+        await run_simulation_cycle("crisis")
     elif "viral" in args:
-        run_simulation_cycle("viral")
+        await run_simulation_cycle("viral")
     else:
         # CHANGED: Trigger time set to 120 seconds (2 minutes)
         print("🚀 Background Loop Started (Every 2 Minutes)...")
         while True:
-            run_simulation_cycle("normal")
-            time.sleep(3600)
\ No newline at end of file
+            await run_simulation_cycle("normal")
+            await asyncio.sleep(3600)
+
+if __name__ == "__main__":
+    args = [a.replace('--', '') for a in sys.argv]
+    # One event loop for the whole process so the async OpenAI client can reuse its connections
+    asyncio.run(main(args))
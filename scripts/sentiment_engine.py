@@ -1,16 +1,340 @@
 import pandas as pd
+import numpy as np
+import csv
+import functools
+import hashlib
 import json
 import os
+import re
+import sqlite3
+import sys
+import tempfile
 import torch
+import traceback
 from datetime import datetime
-from transformers import pipeline
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from transformers import AutoTokenizer, pipeline
 
 # --- CONFIGURATION ---
 INPUT_DIR = '../server/data'
 OUTPUT_FILE_DETAILED = '../server/data/enriched_comments_sentiment.csv'
 OUTPUT_FILE_SUMMARY = '../server/data/platform_sentiment_summary.json'
 OUTPUT_FILE_HISTORY = '../server/data/sentiment_history.csv'
+SUMMARY_COUNTERS_FILE = '../server/data/summary_counters.json'
+LAST_MTIME_FILE = '../server/data/.last_mtime'
+PLATFORMS = ['instagram', 'twitter', 'facebook', 'linkedin']
 MODEL_ID = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+BATCH_SIZE = 64
+# One export directory per source model, so changing MODEL_ID never loads a stale export
+ONNX_MODEL_DIR = os.path.join('../models', MODEL_ID.replace('/', '--') + '-onnx')
+ONNX_INT8_FILE = 'model_int8.onnx'
+HISTORY_TAIL_BYTES = 4096
+WORKER_PORT = 8001
+CACHE_DB = '../server/data/sent_cache.db'
+SQLITE_MAX_PARAMS = 900  # stay under SQLite's bound-parameter limit
+
+# XLM-RoBERTa can return LABEL_0, etc., or direct text
+LABEL_MAP = {
+    "LABEL_0": "negative",
+    "LABEL_1": "neutral",
+    "LABEL_2": "positive",
+    "negative": "negative",
+    "neutral": "neutral",
+    "positive": "positive"
+}
+
+# Labels reported in the platform summary
+SUMMARY_LABELS = ['negative', 'neutral', 'positive']
+
+# --- LANGUAGE DETECTION PATTERNS ---
+# Emoji ranges: emoticons, symbols, pictographs, transport, flags
+EMOJI_RE = re.compile(r'[0-9]+\.|\U0001F600-\U0001F64F|\U0001F300-\U0001F5FF|\U0001F680-\U0001F6FF|\U0001F1E0-\U0001F1FF|\U00002702-\U000027B0|\U000024C2-\U0001F251|\U0001F900-\U0001F9FF|\U0001FA00-\U0001FA6F')
+DEVANAGARI_FIRST, DEVANAGARI_LAST = 0x0900, 0x097F
+
+# Common Hinglish/Hindi words (transliterated)
+HINGLISH_WORDS = frozenset({
+    'hai', 'hain', 'tha', 'thi', 'kar', 'kya', 'yeh', 'woh', 'mast',
+    'ekdum', 'bohot', 'bahut', 'achha', 'accha', 'theek', 'thik',
+    'karo', 'karna', 'kitna', 'kitne', 'aur', 'ka', 'ki', 'ke',
+    'nahi', 'nahin', 'bilkul', 'sahi', 'galat', 'kuch', 'kab',
+    'kahan', 'kaun', 'kyun', 'kaise', 'abhi', 'ab', 'phir',
+    'dekho', 'dekh', 'sunna', 'suno', 'bola', 'boli', 'gaya',
+    'gayi', 'lena', 'liya', 'dena', 'diya', 'kapde', 'comfy'
+})
+HINGLISH_RE = re.compile(r'\b(?:' + '|'.join(sorted(HINGLISH_WORDS)) + r')\b')
+
+def load_tokenizer(path):
+    """
+    Loads the Rust-backed fast tokenizer, falling back to the slow sentencepiece
+    one. Without a tokenizer.json in the checkpoint, the fast tokenizer is
+    converted from sentencepiece on the fly, which also needs protobuf.
+    """
+    try:
+        return AutoTokenizer.from_pretrained(path, use_fast=True)
+    except (ImportError, ValueError) as e:
+        print(f"⚠️ Fast tokenizer unavailable ({e}); using the slow tokenizer. pip install protobuf to enable it.")
+        return AutoTokenizer.from_pretrained(path, use_fast=False)
+
+@functools.lru_cache(maxsize=1)
+def model_build():
+    """Which build of MODEL_ID this host runs: 'torch-fp16', 'onnx-int8' or 'torch-fp32'."""
+    if torch.cuda.is_available():
+        return 'torch-fp16'
+
+    # On CPU, prefer the INT8 ONNX export when it exists and optimum is installed
+    if os.path.exists(os.path.join(ONNX_MODEL_DIR, ONNX_INT8_FILE)):
+        try:
+            import optimum.onnxruntime
+            return 'onnx-int8'
+        except ImportError:
+            print("⚠️ optimum[onnxruntime] not installed, falling back to PyTorch model")
+
+    return 'torch-fp32'
+
+def model_variant():
+    """
+    Names the model and build this host scores with. Different models, and
+    quantized or half-precision builds of one, score slightly differently, so
+    the variant is part of the score cache key and switching re-scores every comment.
+    """
+    return f"{MODEL_ID}:{model_build()}"
+
+@functools.lru_cache(maxsize=1)
+def get_pipeline():
+    """Loads the XLM-RoBERTa pipeline once and reuses it for the life of the process."""
+    print(f"Loading Model: {MODEL_ID}...")
+    build = model_build()
+
+    if build == 'onnx-int8':
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        model = ORTModelForSequenceClassification.from_pretrained(ONNX_MODEL_DIR, file_name=ONNX_INT8_FILE)
+        print(f"Using INT8 ONNX model from {ONNX_MODEL_DIR}")
+        return pipeline("sentiment-analysis", model=model, tokenizer=load_tokenizer(ONNX_MODEL_DIR))
+
+    use_cuda = build == 'torch-fp16'
+    return pipeline(
+        "sentiment-analysis", 
+        model=MODEL_ID, 
+        tokenizer=load_tokenizer(MODEL_ID),
+        device=0 if use_cuda else -1,
+        # Half precision only on GPU; CPU kernels for FP16 are slower than FP32
+        torch_dtype=torch.float16 if use_cuda else torch.float32
+    )
+
+def export_onnx_model():
+    """One-time export of the model to ONNX with dynamic INT8 quantization for CPU inference."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    print(f"Exporting {MODEL_ID} to ONNX...")
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_ID, export=True)
+    model.save_pretrained(ONNX_MODEL_DIR)
+    load_tokenizer(MODEL_ID).save_pretrained(ONNX_MODEL_DIR)
+
+    print("Quantizing weights to INT8...")
+    quantize_dynamic(
+        os.path.join(ONNX_MODEL_DIR, 'model.onnx'),
+        os.path.join(ONNX_MODEL_DIR, ONNX_INT8_FILE),
+        weight_type=QuantType.QInt8
+    )
+    print(f"✅ INT8 ONNX model saved to: {ONNX_MODEL_DIR}")
+
+def comment_hash(text):
+    """Stable cache key for a comment's text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def open_sentiment_cache():
+    """Opens the on-disk (hash, model variant) -> (label, score) cache, creating it if needed."""
+    conn = sqlite3.connect(CACHE_DB)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sentiment_scores "
+        "(hash TEXT, variant TEXT, label TEXT, score REAL, PRIMARY KEY (hash, variant))"
+    )
+    return conn
+
+def load_cached_scores(conn, hashes, variant):
+    """Returns {hash: (label, score)} for every hash this model variant already scored."""
+    cached = {}
+    unique_hashes = list(set(hashes))
+    for start in range(0, len(unique_hashes), SQLITE_MAX_PARAMS):
+        chunk = unique_hashes[start:start + SQLITE_MAX_PARAMS]
+        placeholders = ','.join('?' * len(chunk))
+        rows = conn.execute(
+            f"SELECT hash, label, score FROM sentiment_scores WHERE variant = ? AND hash IN ({placeholders})",
+            [variant] + chunk
+        )
+        for h, label, score in rows:
+            cached[h] = (label, score)
+    return cached
+
+def store_cached_scores(conn, rows, variant):
+    """Persists freshly scored (hash, label, score) rows for this model variant."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO sentiment_scores (hash, variant, label, score) VALUES (?, ?, ?, ?)",
+        [(h, variant, label, score) for h, label, score in rows]
+    )
+    conn.commit()
+
+def has_devanagari(texts):
+    """
+    Flags texts containing any Devanagari codepoint. All texts are packed into
+    one UTF-32 buffer so the range check runs as a single numpy pass, then
+    reduced per text via prefix sums over the per-text offsets.
+    """
+    lengths = texts.str.len().to_numpy()
+    codepoints = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype='<u4')
+    hits = np.concatenate(([0], np.cumsum((codepoints >= DEVANAGARI_FIRST) & (codepoints <= DEVANAGARI_LAST))))
+    ends = np.cumsum(lengths)
+    # Prefix-sum differences instead of np.add.reduceat, which mishandles empty texts
+    return pd.Series(hits[ends] - hits[ends - lengths] > 0, index=texts.index)
+
+def detect_languages(comments):
+    """
+    Vectorized language detection over a Series of comment strings (no NA):
+    - Handles Hinglish (mix of Hindi and English)
+    - More robust for short text with emojis
+    - Uses pattern matching for common Hinglish words
+    """
+    text = comments.str.strip()
+    clean_text = text.str.replace(EMOJI_RE, '', regex=True).str.strip().str.lower()
+    has_hindi_script = has_devanagari(text)
+    hinglish_count = clean_text.str.count(HINGLISH_RE)
+    word_count = clean_text.str.split().str.len()
+
+    # Classification logic (first matching rule wins):
+    # - too short after cleaning -> English
+    # - any Devanagari script -> Hinglish (always mixed with other words here)
+    # - multiple Hinglish words, or one in a short text -> Hinglish
+    return np.select(
+        [
+            clean_text.str.len() < 3,
+            has_hindi_script,
+            hinglish_count >= 2,
+            (hinglish_count == 1) & (word_count <= 5)
+        ],
+        ['en', 'hinglish', 'hinglish', 'hinglish'],
+        default='en'
+    )
+
+def input_version(comments_path):
+    """
+    Identifies everything a run's outputs depend on: the comments file, the
+    organic posts files behind the platform mapping, and the scoring model.
+    The comments file's size is included because it is append-only, and
+    coarse mtimes (HFS+, FAT, network mounts) can miss an append made in the
+    same tick as the last run.
+    """
+    comments_stat = os.stat(comments_path)
+    parts = [str(comments_stat.st_mtime_ns), str(comments_stat.st_size)]
+    for p in PLATFORMS:
+        file_path = os.path.join(INPUT_DIR, f'{p}_organic_posts.csv')
+        parts.append(str(os.stat(file_path).st_mtime_ns) if os.path.exists(file_path) else '-')
+    parts.append(model_variant())
+    return ' '.join(parts)
+
+def read_comments(path):
+    """Reads the comments CSV, using pyarrow's multithreaded parser when it is installed."""
+    dtype = {'post_id': 'string', 'comment_text': 'string'}
+    try:
+        return pd.read_csv(path, dtype=dtype, engine='pyarrow')
+    except ImportError:
+        return pd.read_csv(path, dtype=dtype)
+
+def read_recent_history_timestamps():
+    """Returns the timestamps found in the last HISTORY_TAIL_BYTES of the history CSV."""
+    with open(OUTPUT_FILE_HISTORY, 'rb') as f:
+        start = max(0, os.path.getsize(OUTPUT_FILE_HISTORY) - HISTORY_TAIL_BYTES)
+        f.seek(start)
+        lines = f.read().decode('utf-8', errors='ignore').splitlines()
+    # The first line is likely cut mid-row unless we read from the start
+    if start > 0:
+        lines = lines[1:]
+    return {line.split(',', 1)[0] for line in lines if line}
+
+def empty_summary_counters():
+    return {"rows_processed": 0, "fingerprint": None, "platforms": {}}
+
+def load_summary_counters():
+    """Loads the persisted per-platform label counters, or empty ones if missing or unreadable."""
+    if not os.path.exists(SUMMARY_COUNTERS_FILE):
+        return empty_summary_counters()
+    try:
+        with open(SUMMARY_COUNTERS_FILE) as f:
+            counters = json.load(f)
+        if not all(key in counters for key in ("rows_processed", "fingerprint", "platforms")):
+            raise ValueError("missing keys")
+        return counters
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️ Rebuilding summary counters - {SUMMARY_COUNTERS_FILE} unreadable: {e}")
+        return empty_summary_counters()
+
+def rows_fingerprint(hashes, platforms, variant):
+    """
+    Digest of the counted rows, in order: each comment hash with the platform it
+    was counted under, plus the model variant that scored them.
+    """
+    digest = hashlib.blake2b(variant.encode('utf-8'), digest_size=16)
+    for h, platform in zip(hashes, platforms):
+        # Hashes are fixed-width; the NUL keeps variable-length platforms unambiguous
+        digest.update(f"{h}{platform}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+def write_json_atomic(path, data):
+    """Writes JSON via a unique temp file + os.replace so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+        # mkstemp creates owner-only files; keep the usual permissions for the Node server
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def add_label_counts(counters, new_rows):
+    """Adds the labels of newly processed rows to their platform's counters."""
+    if new_rows.empty:
+        return
+
+    label_counts = pd.crosstab(new_rows['platform'], new_rows['label'])
+    platform_totals = new_rows['platform'].value_counts()
+
+    for platform, row in label_counts.iterrows():
+        platform_counters = counters['platforms'].setdefault(
+            platform, {"positive": 0, "neutral": 0, "negative": 0, "total": 0}
+        )
+        for label in SUMMARY_LABELS:
+            platform_counters[label] += int(row.get(label, 0))
+        # Labels outside SUMMARY_LABELS still count towards the total
+        platform_counters['total'] += int(platform_totals[platform])
+
+def build_summary(counters):
+    """Derives distribution percentages and health scores from the counters."""
+    summary_data = []
+
+    for platform in sorted(counters['platforms']):
+        platform_counters = counters['platforms'][platform]
+        total = platform_counters['total']
+        pos = platform_counters['positive'] / total * 100
+        neu = platform_counters['neutral'] / total * 100
+        neg = platform_counters['negative'] / total * 100
+
+        # Health Score Logic: (Positive weight 1.0) + (Neutral weight 0.5)
+        health_score = pos + (neu * 0.5)
+
+        summary_data.append({
+            "platform": platform,
+            "health_score": round(health_score, 2),
+            "distribution": {
+                "positive": round(pos, 1),
+                "neutral": round(neu, 1),
+                "negative": round(neg, 1)
+            },
+            "total_comments": total
+        })
+
+    return summary_data
 
 def update_history(summary_data):
     """Appends current health scores to a history CSV for the trend chart."""
@@ -19,25 +343,24 @@ def update_history(summary_data):
     file_exists = os.path.isfile(OUTPUT_FILE_HISTORY)
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
 
-    # Check if this exact timestamp already exists to prevent duplicates
+    # Check if this exact timestamp already exists to prevent duplicates.
+    # Rows are appended chronologically, so only the end of the file matters.
     if file_exists:
-        existing_df = pd.read_csv(OUTPUT_FILE_HISTORY)
-        if timestamp in existing_df['timestamp'].values:
+        if timestamp in read_recent_history_timestamps():
             print(f"⚠️ Skipping history update - timestamp {timestamp} already exists")
             return
 
     history_rows = []
     for item in summary_data:
-        history_rows.append({
-            "timestamp": timestamp,
-            "platform": item['platform'],
-            "health_score": item['health_score']
-        })
+        history_rows.append([timestamp, item['platform'], item['health_score']])
 
     if history_rows:
-        history_df = pd.DataFrame(history_rows)
-        # Append to CSV: header=False if file already exists
-        history_df.to_csv(OUTPUT_FILE_HISTORY, mode='a', index=False, header=not file_exists)
+        with open(OUTPUT_FILE_HISTORY, 'a', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            # Write the header only when creating the file
+            if not file_exists:
+                writer.writerow(["timestamp", "platform", "health_score"])
+            writer.writerows(history_rows)
         print(f"✅ History updated in: {OUTPUT_FILE_HISTORY}")
 
 def run_full_pipeline():
@@ -49,158 +372,162 @@ def run_full_pipeline():
         print(f"Error: {comments_path} not found.")
         return
 
-    df = pd.read_csv(comments_path)
+    # Skip the whole run if no input has changed since the last one and its
+    # outputs are still in place
+    comments_version = input_version(comments_path)
+    outputs_exist = all(os.path.exists(p) for p in (OUTPUT_FILE_DETAILED, OUTPUT_FILE_SUMMARY, OUTPUT_FILE_HISTORY))
+    if outputs_exist and os.path.exists(LAST_MTIME_FILE):
+        with open(LAST_MTIME_FILE) as f:
+            if f.read().strip() == comments_version:
+                print("No new comments or input changes since the last run. Nothing to do.")
+                return
+
+    df = read_comments(comments_path)
     if df.empty:
         print("Warning: synthetic_comments_data.csv is empty.")
         return
-    
-    # 2. INITIALIZE AI MODEL (XLM-RoBERTa)
-    print(f"Loading Model: {MODEL_ID}...")
-    sentiment_pipe = pipeline(
-        "sentiment-analysis", 
-        model=MODEL_ID, 
-        tokenizer=MODEL_ID,
-        use_fast=False,
-        device=0 if torch.cuda.is_available() else -1
-    )
 
-    # 3. RUN ANALYSIS
-    print(f"Analyzing {len(df)} comments. Processing...")
-    texts = df['comment_text'].astype(str).tolist()
-    results = sentiment_pipe(texts)
-
-    # Standardizing labels (XLM-RoBERTa can return LABEL_0, etc., or direct text)
-    label_map = {
-        "LABEL_0": "negative",
-        "LABEL_1": "neutral",
-        "LABEL_2": "positive",
-        "negative": "negative",
-        "neutral": "neutral",
-        "positive": "positive"
-    }
-
-    df['label'] = [label_map.get(r['label'], r['label']) for r in results]
-    df['score'] = [round(r['score'], 4) for r in results]
-
-    # 4. MAP PLATFORMS
+    # Blank comments (the streamer writes the LLM's empty lines) read back as NA;
+    # normalize them to '' so hashing, scoring and language detection see real text
+    df['comment_text'] = df['comment_text'].fillna('')
+    
+    # 2. LOOK UP CACHED SCORES (only new comment texts need the model)
+    texts = df['comment_text'].tolist()
+    hashes = [comment_hash(t) for t in texts]
+
+    conn = open_sentiment_cache()
+    variant = model_variant()
+    cached = load_cached_scores(conn, hashes, variant)
+    pending = {}
+    for h, t in zip(hashes, texts):
+        if h not in cached:
+            pending.setdefault(h, t)
+    print(f"Reusing {sum(h in cached for h in hashes)} cached scores; {len(pending)} new comments to analyze.")
+
+    if pending:
+        # 3. INITIALIZE AI MODEL (XLM-RoBERTa)
+        sentiment_pipe = get_pipeline()
+
+        # 4. RUN ANALYSIS
+        print(f"Analyzing {len(pending)} comments. Processing...")
+        pending_hashes = list(pending)
+        pending_texts = [pending[h] for h in pending_hashes]
+
+        # Sort by length so each batch pads to a similar size
+        order = sorted(range(len(pending_texts)), key=lambda i: len(pending_texts[i]))
+        with torch.inference_mode():
+            sorted_results = sentiment_pipe(
+                [pending_texts[i] for i in order],
+                batch_size=BATCH_SIZE,
+                truncation=True,
+                padding=True
+            )
+        new_rows = [(pending_hashes[i], r['label'], r['score']) for i, r in zip(order, sorted_results)]
+        store_cached_scores(conn, new_rows, variant)
+        for h, label, score in new_rows:
+            cached[h] = (label, score)
+
+    conn.close()
+    results = pd.DataFrame([cached[h] for h in hashes], columns=['label', 'score'], index=df.index)
+
+    # Standardize labels, keeping any unrecognized label as-is
+    df['label'] = results['label'].map(LABEL_MAP).fillna(results['label'])
+    df['score'] = results['score'].round(4)
+
+    # 5. MAP PLATFORMS
     print("Mapping posts to platforms...")
-    platforms = ['instagram', 'twitter', 'facebook', 'linkedin']
-    post_to_platform = {}
+    platform_frames = []
 
-    for p in platforms:
+    for p in PLATFORMS:
         file_path = os.path.join(INPUT_DIR, f'{p}_organic_posts.csv')
         if os.path.exists(file_path):
-            temp_df = pd.read_csv(file_path)
-            for pid in temp_df['post_id']:
-                post_to_platform[pid] = p.capitalize()
+            platform_frames.append(pd.read_csv(file_path, usecols=['post_id'], dtype={'post_id': 'string'}).assign(platform=p.capitalize()))
 
-    # Apply mapping, defaulting to 'General' if post_id is unknown
-    df['platform'] = df['post_id'].map(post_to_platform).fillna('General')
+    if platform_frames:
+        # Later files win on duplicate post_ids, and the merge must not fan out rows
+        mapping = pd.concat(platform_frames, ignore_index=True).drop_duplicates('post_id', keep='last')
+        df = df.merge(mapping, on='post_id', how='left')
+    else:
+        df['platform'] = None
 
-    # 5. DETECT LANGUAGES
+    # Default to 'General' if post_id is unknown
+    df['platform'] = df['platform'].fillna('General')
+
+    # 6. DETECT LANGUAGES
     print("Detecting languages...")
-    import re
-
-    def detect_language(text):
-        """
-        Improved language detection:
-        - Handles Hinglish (mix of Hindi and English)
-        - More robust for short text with emojis
-        - Uses pattern matching for common Hinglish words
-        """
-        try:
-            text_str = str(text).strip()
-
-            # Remove emojis, numbers, and special characters for better detection
-            # Emoji ranges: emoticons, symbols, pictographs, transport, flags
-            emoji_pattern = r'[0-9]+\.|\U0001F600-\U0001F64F|\U0001F300-\U0001F5FF|\U0001F680-\U0001F6FF|\U0001F1E0-\U0001F1FF|\U00002702-\U000027B0|\U000024C2-\U0001F251|\U0001F900-\U0001F9FF|\U0001FA00-\U0001FA6F'
-            clean_text = re.sub(emoji_pattern, '', text_str)
-            clean_text = clean_text.strip()
-
-            # If text is too short after cleaning, default to English
-            if len(clean_text) < 3:
-                return 'en'
-
-            # Check for Devanagari script (Hindi characters)
-            has_hindi_script = bool(re.search(r'[\u0900-\u097F]', text_str))
-
-            # Common Hinglish/Hindi words (transliterated)
-            hinglish_words = [
-                'hai', 'hain', 'tha', 'thi', 'kar', 'kya', 'yeh', 'woh', 'mast',
-                'ekdum', 'bohot', 'bahut', 'achha', 'accha', 'theek', 'thik',
-                'karo', 'karna', 'kitna', 'kitne', 'aur', 'ka', 'ki', 'ke',
-                'nahi', 'nahin', 'bilkul', 'sahi', 'galat', 'kuch', 'kab',
-                'kahan', 'kaun', 'kyun', 'kaise', 'abhi', 'ab', 'phir',
-                'dekho', 'dekh', 'sunna', 'suno', 'bola', 'boli', 'gaya',
-                'gayi', 'lena', 'liya', 'dena', 'diya', 'kapde', 'comfy'
-            ]
-
-            # Convert to lowercase for matching
-            text_lower = clean_text.lower()
-
-            # Count Hinglish words
-            hinglish_count = sum(1 for word in hinglish_words if f' {word} ' in f' {text_lower} ' or text_lower.startswith(word + ' ') or text_lower.endswith(' ' + word))
-
-            # Check for English words (basic heuristic)
-            english_words = text_lower.split()
-            has_english = len(english_words) > 0
-
-            # Classification logic
-            if has_hindi_script and has_english:
-                return 'hinglish'  # Mix of Hindi script and English
-            elif has_hindi_script:
-                return 'hi'  # Pure Hindi (Devanagari script)
-            elif hinglish_count >= 2:
-                return 'hinglish'  # Multiple Hinglish words detected
-            elif hinglish_count == 1 and len(english_words) <= 5:
-                return 'hinglish'  # Short text with Hinglish word
-            else:
-                return 'en'  # Default to English
-
-        except Exception as e:
-            print(f"Warning: Language detection error for text: {text[:50]}... - Error: {e}")
-            return 'en'  # Default to English on error
-
-    df['language'] = df['comment_text'].apply(detect_language)
+    df['language'] = detect_languages(df['comment_text'])
 
     # Save detailed CSV for the Action Center
     df.to_csv(OUTPUT_FILE_DETAILED, index=False)
     print(f"✅ Detailed sentiment saved to: {OUTPUT_FILE_DETAILED}")
 
-    # 6. GENERATE SUMMARY FOR FRONTEND
+    # 7. GENERATE SUMMARY FOR FRONTEND
     print("Generating Platform Summary...")
-    summary_data = []
-    
-    # Calculate health scores per platform (grouping by mapped platform)
-    for platform, group in df.groupby('platform'):
-        counts = group['label'].value_counts(normalize=True) * 100
-        pos = counts.get('positive', 0)
-        neg = counts.get('negative', 0)
-        neu = counts.get('neutral', 0)
-        
-        # Health Score Logic: (Positive weight 1.0) + (Neutral weight 0.5)
-        health_score = pos + (neu * 0.5)
 
-        summary_data.append({
-            "platform": platform,
-            "health_score": round(health_score, 2),
-            "distribution": {
-                "positive": round(pos, 1),
-                "neutral": round(neu, 1),
-                "negative": round(neg, 1)
-            },
-            "total_comments": len(group)
-        })
+    # The comments CSV is append-only, so only rows past the last processed
+    # offset need counting. Start over if the rows already counted are no longer
+    # the same (file replaced, trimmed or edited), now map to another platform,
+    # or were scored by another model.
+    counters = load_summary_counters()
+    counted = counters['rows_processed']
+    row_platforms = df['platform'].tolist()
+    if counted > len(df) or counters['fingerprint'] != rows_fingerprint(hashes[:counted], row_platforms[:counted], variant):
+        if counted:
+            print("Comments changed since the counters were built. Recounting all rows...")
+        counters = empty_summary_counters()
+    add_label_counts(counters, df.iloc[counters['rows_processed']:])
+    counters['rows_processed'] = len(df)
+    counters['fingerprint'] = rows_fingerprint(hashes, row_platforms, variant)
+    write_json_atomic(SUMMARY_COUNTERS_FILE, counters)
+
+    summary_data = build_summary(counters)
 
     # Save JSON summary for Gauges
-    with open(OUTPUT_FILE_SUMMARY, 'w') as f:
-        json.dump(summary_data, f, indent=4)
+    write_json_atomic(OUTPUT_FILE_SUMMARY, summary_data)
     
     # Update the history log for the Trend Chart
     update_history(summary_data)
     
     print(f"✅ Summary JSON saved to: {OUTPUT_FILE_SUMMARY}")
+
+    # Record the input version only after every output has been written
+    with open(LAST_MTIME_FILE, 'w') as f:
+        f.write(comments_version)
     print("--- Pipeline Complete ---")
 
+class ScoreHandler(BaseHTTPRequestHandler):
+    """POST /score re-runs the pipeline against the already-loaded model."""
+
+    def do_POST(self):
+        if self.path != '/score':
+            self.send_error(404)
+            return
+
+        try:
+            run_full_pipeline()
+            status, body = 200, {"success": True}
+        except Exception:
+            print("❌ Pipeline failed:")
+            traceback.print_exc()
+            status, body = 500, {"success": False}
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def serve(port=WORKER_PORT):
+    """Keeps the model resident and scores on demand (single-threaded, so runs never overlap)."""
+    get_pipeline()
+    print(f"🚀 Sentiment worker listening on http://127.0.0.1:{port}/score")
+    HTTPServer(('127.0.0.1', port), ScoreHandler).serve_forever()
+
 if __name__ == "__main__":
-    run_full_pipeline()
\ No newline at end of file
+    if "--export-onnx" in sys.argv:
+        export_onnx_model()
+    elif "--serve" in sys.argv:
+        serve()
+    else:
+        run_full_pipeline()
\ No newline at end of file
@@ -35,6 +35,30 @@ app.use(express.json());
 // SHARED SIMULATION LOGIC (WITH SCENARIO SUPPORT)
 // ═══════════════════════════════════════════════════════════════════════════
 
+/**
+ * Runs the sentiment engine. When SENTIMENT_WORKER_URL points at a resident
+ * worker (`python3 sentiment_engine.py --serve`), the already-loaded model is
+ * reused. A one-off process is spawned only when the variable is unset or the
+ * worker can't be reached at all: a slow worker may still be mid-run, and a
+ * second engine would load the model again and race it on the same files, so
+ * a timeout (SENTIMENT_WORKER_TIMEOUT_MS) is reported as an error instead.
+ */
+const WORKER_UNREACHABLE_CODES = ['ECONNREFUSED', 'ENOTFOUND'];
+
+const runSentimentEngine = (callback) => {
+  const spawnEngine = () => exec('python3 ../scripts/sentiment_engine.py', callback);
+  const workerUrl = process.env.SENTIMENT_WORKER_URL;
+  if (!workerUrl) return spawnEngine();
+
+  const timeoutMs = Number(process.env.SENTIMENT_WORKER_TIMEOUT_MS) || 120000;
+  fetch(`${workerUrl}/score`, { method: 'POST', signal: AbortSignal.timeout(timeoutMs) })
+    .then(r => callback(r.ok ? null : new Error(`Sentiment worker responded ${r.status}`)))
+    .catch(err => {
+      if (WORKER_UNREACHABLE_CODES.includes(err.cause?.code)) return spawnEngine();
+      callback(err);
+    });
+};
+
 /**
  * Executes a specific simulation scenario (normal, crisis, viral)
  * then runs the sentiment engine to update the dashboard.
@@ -49,7 +73,7 @@ const runSimulationScenario = (scenario = "normal") => {
     console.log(`📝 Mock Data Injected (${scenario}).`);
 
     // Step 2: Run Sentiment Engine to process the new AI comments
-    exec('python3 ../scripts/sentiment_engine.py', (err2) => {
+    runSentimentEngine((err2) => {
       if (err2) return console.error("❌ AI Engine Step Failed:", err2);
       console.log("🤖 AI Re-analysis Complete. Dashboard Live.");
     });
@@ -109,7 +133,7 @@ app.get('/api/sentiment/negative-alerts', async (req, res) => {
 });
 
 app.post('/api/sentiment/refresh', (req, res) => {
-  exec('python3 ../scripts/sentiment_engine.py', (error) => {
+  runSentimentEngine((error) => {
     if (error) return res.status(500).json({ success: false });
     res.json({ success: true });
   });